@@ -2,3 +2,4 @@ from .base import BaseAgent
 from .planner import PlannerAgent
 from .executor import ExecutorAgent
 from .verifier import VerifierAgent
+from .tool_calling import ToolCallingAgent
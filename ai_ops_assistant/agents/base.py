@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 from typing import Any, Dict, List, Optional
+from ..deadline import Deadline
 from ..llm.client import LLMClient
 
 class BaseAgent(ABC):
@@ -9,3 +10,10 @@ class BaseAgent(ABC):
     @abstractmethod
     def run(self, *args, **kwargs) -> Any:
         pass
+
+    def _llm_timeout(self, deadline: Optional[Deadline], what: str) -> Optional[float]:
+        """Time left for an LLM call under `deadline`; raises DeadlineExceeded if none."""
+        if deadline is None:
+            return None
+        deadline.check(what)
+        return deadline.remaining()
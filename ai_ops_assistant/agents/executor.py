@@ -1,43 +1,79 @@
-from typing import Any, Dict, List
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Dict, List, Optional
 from .base import BaseAgent
+from ..deadline import Deadline, DeadlineExceeded, deadline_scope
 from ..llm.client import LLMClient
-from ..tools.base import ToolRegistry
+from ..memory import ResultStore, SessionMemory
+from ..tools.base import BaseTool, ToolRegistry, is_error_output
+from ..tools.circuit import BreakerRegistry, NegativeCache, tool_breakers, unavailable_result
+from ..tools.transport import UpstreamUnavailable
+
+# Tool calls under a deadline run here so the executor can stop waiting on them.
+# A call that overruns is abandoned, not killed; its HTTP timeouts are derived
+# from the same deadline, so the worker frees itself shortly afterwards.
+_tool_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="ai-ops-tool")
 
 class ExecutorAgent(BaseAgent):
-    def __init__(self, llm: LLMClient, tool_registry: ToolRegistry):
+    def __init__(
+        self,
+        llm: LLMClient,
+        tool_registry: ToolRegistry,
+        breakers: Optional[BreakerRegistry] = None,
+        negative_cache: Optional[NegativeCache] = None
+    ):
         super().__init__(llm)
         self.tool_registry = tool_registry
+        self.breakers = breakers if breakers is not None else tool_breakers
+        self.negative_cache = negative_cache if negative_cache is not None else NegativeCache()
+
+    def is_available(self, tool_name: str) -> bool:
+        return tool_name == "none" or not self.breakers.get(tool_name).is_open()
 
-    def _resolve_args(self, args: Dict[str, Any], context: Dict[int, Any]) -> Dict[str, Any]:
+    def unavailable_tools(self) -> List[str]:
+        """Registered tools whose circuit is currently open."""
+        return [t.name for t in self.tool_registry.list_tools() if not self.is_available(t.name)]
+
+    def _resolve_args(
+        self,
+        args: Dict[str, Any],
+        context: Dict[int, Any],
+        session: Optional[SessionMemory] = None
+    ) -> Dict[str, Any]:
         """
-        Recursively resolve arguments containing {{step_N...}} placeholders.
+        Recursively resolve arguments containing {{step_N...}} placeholders,
+        and {{session.last.step_N...}} / {{session.turn_K.step_N...}} ones that
+        point at results from earlier turns of the session.
         """
         import re
         
         resolved = {}
         for k, v in args.items():
             if isinstance(v, str):
-                # Regex to match {{step_N.path}} or {step_N.path}
-                match = re.search(r"\{+step_(\d+)(.*?)\}+", v)
+                # Regex to match {{step_N.path}} or {step_N.path}, optionally session-qualified
+                match = re.search(r"\{+(?:session\.(last|turn_\d+)\.)?step_(\d+)(.*?)\}+", v)
                 if match:
-                    step_id = int(match.group(1))
-                    raw_path = match.group(2).strip(".").split(".")
+                    turn_ref = match.group(1)
+                    step_id = int(match.group(2))
+                    raw_path = match.group(3).strip(".").split(".")
                     
-                    # 1. Get step result
-                    val = context.get(step_id)
+                    # 1. Get step result (loaded from disk only if it was spilled)
+                    if turn_ref:
+                        val = session.get_step(turn_ref, step_id) if session is not None else None
+                    else:
+                        val = ResultStore.materialize(context.get(step_id))
                     
                     # 2. Traverse path
                     try:
                         for part in raw_path:
                             if not part: continue
                             
-                            # Handle array access like items[0]
-                            array_match = re.match(r"(\w+)\[(\d+)\]", part)
+                            # Handle array access like items[0], or a bare [0] on a list output
+                            array_match = re.match(r"(\w*)\[(\d+)\]", part)
                             if array_match:
                                 key_name = array_match.group(1)
                                 index = int(array_match.group(2))
                                 
-                                if isinstance(val, dict):
+                                if key_name and isinstance(val, dict):
                                     val = val.get(key_name)
                                 if isinstance(val, list) and 0 <= index < len(val):
                                     val = val[index]
@@ -68,20 +104,88 @@ class ExecutorAgent(BaseAgent):
                 resolved[k] = v
         return resolved
 
-    def run(self, plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _call_tool(self, tool: BaseTool, tool_args: Dict[str, Any], deadline: Optional[Deadline]) -> Any:
+        if deadline is None:
+            return tool.run(**tool_args)
+
+        def _run() -> Any:
+            with deadline_scope(deadline):
+                return tool.run(**tool_args)
+
+        deadline.check(f"calling {tool.name}")
+        future = _tool_pool.submit(_run)
+        try:
+            return future.result(timeout=deadline.remaining())
+        except FutureTimeout:
+            future.cancel()
+            raise DeadlineExceeded(f"Tool '{tool.name}' did not finish before its deadline")
+
+    def _guarded_call(self, tool_name: str, tool: BaseTool, tool_args: Dict[str, Any], deadline: Optional[Deadline]) -> Any:
+        """
+        Call the tool unless its circuit is open or the same call failed moments ago.
+        Only upstream outages count against the tool's breaker; any failure goes
+        into the negative cache.
+        """
+        cache_key = NegativeCache.key(tool_name, tool_args)
+        cached = self.negative_cache.get(cache_key)
+        if cached is not None:
+            print(f"  Skipping {tool_name}: the same call failed recently")
+            return cached
+
+        breaker = self.breakers.get(tool_name)
+        if not breaker.allow():
+            print(f"  Skipping {tool_name}: circuit open")
+            return unavailable_result(tool_name, f"Circuit open for tool '{tool_name}'", breaker.retry_after())
+
+        try:
+            print(f"  Calling {tool_name} with {tool_args}")
+            result = self._call_tool(tool, tool_args, deadline)
+        except DeadlineExceeded as e:
+            # Our own budget ran out; that says nothing about the tool's health.
+            return f"Error: {e}"
+        except UpstreamUnavailable as e:
+            breaker.record_failure()
+            result = unavailable_result(tool_name, str(e), breaker.retry_after())
+        except Exception as e:
+            # Usually bad arguments (TypeError, validation errors), not an unhealthy
+            # tool; the breaker is shared across requests, so leave it alone.
+            result = f"Error executing tool: {e}"
+        else:
+            # The tool answered; an error payload here is about the arguments.
+            breaker.record_success()
+            if not is_error_output(result):
+                return result
+
+        self.negative_cache.put(cache_key, result)
+        return result
+
+    def run(
+        self,
+        plan: Dict[str, Any],
+        deadline: Optional[Deadline] = None,
+        store: Optional[ResultStore] = None,
+        session: Optional[SessionMemory] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Execute the plan's steps in order. With a `deadline`, each step gets an
+        even share of the time still left, so time a fast step does not use
+        rolls over to the steps after it. With a `store`, outputs are kept there
+        and large ones come back as ResultHandles instead of raw values. With a
+        `session`, steps whose call was already made recently are answered from it.
+        """
         results = []
         context = {} # Map step_id -> output
         steps = plan.get("steps", [])
         
         print("\n--- Executor Starting ---")
-        for step in steps:
+        for index, step in enumerate(steps):
             step_id = step.get("step_id")
             description = step.get("description")
             tool_name = step.get("tool_name")
             raw_args = step.get("tool_args", {})
 
             # Resolve arguments using context
-            tool_args = self._resolve_args(raw_args, context)
+            tool_args = self._resolve_args(raw_args, context, session)
             
             print(f"Step {step_id}: {description}")
             if tool_args != raw_args:
@@ -89,20 +193,24 @@ class ExecutorAgent(BaseAgent):
             
             if tool_name == "none":
                 result = "No tool execution needed."
+            elif deadline is not None and deadline.expired():
+                result = "Error: Deadline exceeded; step skipped."
             else:
                 tool = self.tool_registry.get_tool(tool_name)
                 if not tool:
                     result = f"Error: Tool '{tool_name}' not found."
                 else:
-                    try:
-                        # We pass context from previous steps if needed (?)
-                        # For now, simplistic execution.
-                        print(f"  Calling {tool_name} with {tool_args}")
-                        result = tool.run(**tool_args)
-                    except Exception as e:
-                        result = f"Error executing tool: {e}"
+                    reused = session.lookup(tool_name, tool_args) if session is not None else None
+                    if reused is not None:
+                        print(f"  Reusing {tool_name} result from earlier in the session")
+                        result = reused
+                    else:
+                        step_deadline = deadline.share(1.0 / (len(steps) - index)) if deadline else None
+                        result = self._guarded_call(tool_name, tool, tool_args, step_deadline)
             
             print(f"  Result: {str(result)[:100]}...") # Truncate for log
+            if store is not None:
+                result = store.put(result)
             
             results.append({
                 "step_id": step_id,
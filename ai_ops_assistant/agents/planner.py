@@ -1,6 +1,9 @@
 import json
-from typing import Any, Dict, List
+import os
+from typing import Any, Dict, List, Optional
 from .base import BaseAgent
+from ..deadline import Deadline
+from ..memory import SessionMemory
 from ..llm.client import LLMClient
 from ..tools.base import ToolRegistry
 
@@ -51,19 +54,60 @@ Example Plan:
   ]
 }}
 
-User Request: {query}
+{session}User Request: {query}
 """
 
+SESSION_CONTEXT = """Session Context:
+Earlier turns of this conversation, with the steps that succeeded:
+{summary}
+
+Reuse these results instead of fetching the same data again:
+- "{{{{session.last.step_1[0].name}}}}" refers to step 1 of the previous turn.
+- "{{{{session.turn_2.step_1}}}}" refers to step 1 of turn 2.
+A plan step with exactly the same tool and arguments as an earlier step is answered from memory.
+
+"""
+
+# How many tool schemas the planner prompt carries, however large the registry grows.
+PLANNER_TOOLS_TOP_K = int(os.getenv("PLANNER_TOOLS_TOP_K", "5"))
+
+def _strip_titles(schema: Any, in_properties: bool = False) -> Any:
+    """Drop pydantic's auto-generated "title" entries; they repeat the field names."""
+    if isinstance(schema, dict):
+        return {
+            k: _strip_titles(v, in_properties=(k == "properties" and not in_properties))
+            for k, v in schema.items()
+            if in_properties or not (k == "title" and isinstance(v, str))
+        }
+    if isinstance(schema, list):
+        return [_strip_titles(v) for v in schema]
+    return schema
+
 class PlannerAgent(BaseAgent):
-    def __init__(self, llm: LLMClient, tool_registry: ToolRegistry):
+    def __init__(self, llm: LLMClient, tool_registry: ToolRegistry, top_k: int = PLANNER_TOOLS_TOP_K):
         super().__init__(llm)
         self.tool_registry = tool_registry
+        self.top_k = top_k
 
-    def run(self, query: str) -> Dict[str, Any]:
-        tools_schema = self.tool_registry.get_tools_schema()
-        tools_str = json.dumps(tools_schema, indent=2)
+    def run(
+        self,
+        query: str,
+        deadline: Optional[Deadline] = None,
+        session: Optional[SessionMemory] = None
+    ) -> Dict[str, Any]:
+        # Offer only the tools relevant to this request. A follow-up ("and its README?")
+        # is matched together with the turn it follows up on.
+        retrieval_query = query
+        if session is not None and session.turns:
+            retrieval_query = f"{session.turns[-1].query} {query}"
+        tools = self.tool_registry.search(retrieval_query, self.top_k)
+        tools_schema = [_strip_titles(tool.to_json_schema()) for tool in tools]
+        tools_str = json.dumps(tools_schema, separators=(",", ":"))
         
-        system_content = PLANNER_PROMPT.format(tools=tools_str, query=query)
+        session_str = ""
+        if session is not None and session.turns:
+            session_str = SESSION_CONTEXT.format(summary=session.summary())
+        system_content = PLANNER_PROMPT.format(tools=tools_str, session=session_str, query=query)
         
         messages = [
             {"role": "system", "content": system_content},
@@ -98,4 +142,5 @@ class PlannerAgent(BaseAgent):
             "required": ["steps"]
         }
 
-        return self.llm.structured_output(messages, plan_schema)
+        timeout = self._llm_timeout(deadline, "planning")
+        return self.llm.structured_output(messages, plan_schema, timeout=timeout)
@@ -0,0 +1,154 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from .base import BaseAgent
+from .executor import ExecutorAgent
+from ..deadline import Deadline
+from ..llm.client import LLMClient
+from ..memory import ResultStore, SessionMemory
+from ..tools.base import ToolRegistry
+
+TOOL_CALLING_PROMPT = """You are an AI Operations Assistant.
+Answer the user's request using the available tools to fetch real data.
+
+Rules:
+- Call only the tools needed for the request.
+- When several tool calls do not depend on each other, make them all at once.
+- Treat a tool error as non-fatal if you can still answer from the other results.
+- Once you have what you need, reply with the final answer as plain text (no tool calls).
+"""
+
+SESSION_CONTEXT = """Earlier turns of this conversation, with the tool calls that succeeded:
+{summary}
+
+Use them to resolve follow-ups ("its README", "Berlin too"). Repeating one of these calls with the same arguments is answered from memory.
+"""
+
+# Tool-calling rounds before the model is asked to answer with what it has.
+MAX_TOOL_ROUNDS = int(os.getenv("MAX_TOOL_ROUNDS", "3"))
+# Share of the time left that tool calls may not use, kept for the next LLM call.
+ANSWER_BUDGET_SHARE = 0.35
+
+class ToolCallingAgent(BaseAgent):
+    """
+    Single-conversation alternative to the Planner -> Executor -> Verifier pipeline.
+
+    The tools are passed to the model as native function tools; the calls it
+    returns are executed (in parallel when there are several) through the
+    ExecutorAgent, so deadlines, circuit breakers, the result store and session
+    reuse all still apply, and the model writes the final answer in the same
+    conversation. A question that needs no tools costs a single LLM call.
+    """
+
+    def __init__(
+        self,
+        llm: LLMClient,
+        tool_registry: ToolRegistry,
+        executor: ExecutorAgent,
+        max_rounds: int = MAX_TOOL_ROUNDS,
+        answer_budget_share: float = ANSWER_BUDGET_SHARE
+    ):
+        super().__init__(llm)
+        self.tool_registry = tool_registry
+        self.executor = executor
+        self.max_rounds = max_rounds
+        self.answer_budget_share = answer_budget_share
+
+    def _execute_calls(
+        self,
+        tool_calls: List[Any],
+        deadline: Optional[Deadline],
+        store: Optional[ResultStore],
+        session: Optional[SessionMemory]
+    ) -> List[Dict[str, Any]]:
+        def _execute(step_id: int, call: Any) -> Dict[str, Any]:
+            try:
+                tool_args = json.loads(call.function.arguments or "{}")
+                problem = None if isinstance(tool_args, dict) else "must be a JSON object"
+            except json.JSONDecodeError as e:
+                problem = f"are not valid JSON: {e}"
+            if problem is not None:
+                return {
+                    "step_id": step_id,
+                    "description": f"Call {call.function.name}",
+                    "tool_name": call.function.name,
+                    "tool_args": {},
+                    "output": f"Error: tool arguments {problem}",
+                }
+            step = {
+                "step_id": step_id,
+                "description": f"Call {call.function.name}",
+                "tool_name": call.function.name,
+                "tool_args": tool_args,
+            }
+            return self.executor.run({"steps": [step]}, deadline=deadline, store=store, session=session)[0]
+
+        if len(tool_calls) == 1:
+            return [_execute(1, tool_calls[0])]
+        with ThreadPoolExecutor(max_workers=len(tool_calls)) as pool:
+            return list(pool.map(_execute, range(1, len(tool_calls) + 1), tool_calls))
+
+    def run(
+        self,
+        query: str,
+        deadline: Optional[Deadline] = None,
+        store: Optional[ResultStore] = None,
+        session: Optional[SessionMemory] = None
+    ) -> Dict[str, Any]:
+        """
+        Answer `query`. Returns the same keys as the VerifierAgent ("status",
+        "final_answer", "missing_info") plus "execution_results" and "llm_calls".
+        """
+        tools_schema = self.tool_registry.get_tools_schema()
+        messages: List[Dict[str, Any]] = [{"role": "system", "content": TOOL_CALLING_PROMPT}]
+        if session is not None and session.turns:
+            messages.append({"role": "system", "content": SESSION_CONTEXT.format(summary=session.summary())})
+        messages.append({"role": "user", "content": query})
+        execution_results: List[Dict[str, Any]] = []
+
+        for round_number in range(self.max_rounds + 1):
+            # The last round offers no tools, so the model has to answer.
+            offer_tools = round_number < self.max_rounds
+            timeout = self._llm_timeout(deadline, "tool-calling round")
+            message = self.llm.chat_completion(
+                messages,
+                tools=tools_schema if offer_tools else None,
+                tool_choice="auto" if offer_tools else None,
+                timeout=timeout,
+            )
+            tool_calls = getattr(message, "tool_calls", None) or []
+            if not tool_calls or not offer_tools:
+                answer = message.content or ""
+                return {
+                    "status": "success" if answer else "failure",
+                    "final_answer": answer,
+                    "missing_info": "" if answer else "The model returned no answer.",
+                    "execution_results": execution_results,
+                    "llm_calls": round_number + 1,
+                }
+
+            messages.append({
+                "role": "assistant",
+                "content": message.content,
+                "tool_calls": [
+                    {
+                        "id": call.id,
+                        "type": "function",
+                        "function": {"name": call.function.name, "arguments": call.function.arguments},
+                    }
+                    for call in tool_calls
+                ],
+            })
+            # Like the pipeline's verifier reserve: a hung tool must not eat the answer's time.
+            tools_deadline = None
+            if deadline is not None:
+                tools_deadline = deadline.share(1.0, reserve_secs=deadline.remaining() * self.answer_budget_share)
+            results = self._execute_calls(tool_calls, tools_deadline, store, session)
+            for call, result in zip(tool_calls, results):
+                messages.append({
+                    "role": "tool",
+                    "tool_call_id": call.id,
+                    "content": json.dumps(result["output"], default=str),
+                })
+            execution_results.extend(results)
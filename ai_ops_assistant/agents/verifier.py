@@ -1,6 +1,7 @@
 import json
 from typing import Any, Dict, List, Optional
 from .base import BaseAgent
+from ..deadline import Deadline
 
 VERIFIER_PROMPT = """You are a Verifier Agent.
 Your job is to review the results of an executed plan and determine if the user's original request was satisfied.
@@ -30,12 +31,26 @@ Output JSON with keys:
 IMPORTANT: Output ONLY valid JSON. Do not use Markdown code blocks (```json ... ```). Just the JSON object.
 """
 
+UNAVAILABLE_TOOLS_NOTE = """
+Unavailable Tools: {tools}
+These tools are currently down or rate-limited. Do NOT use them in a retry_plan; answer with what you have instead.
+"""
+
 class VerifierAgent(BaseAgent):
-    def run(self, query: str, execution_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def run(
+        self,
+        query: str,
+        execution_results: List[Dict[str, Any]],
+        deadline: Optional[Deadline] = None,
+        unavailable_tools: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
         results_json = json.dumps(execution_results, indent=2, default=str)
 
+        content = VERIFIER_PROMPT.format(query=query, results_json=results_json)
+        if unavailable_tools:
+            content += UNAVAILABLE_TOOLS_NOTE.format(tools=", ".join(unavailable_tools))
         messages = [
-            {"role": "user", "content": VERIFIER_PROMPT.format(query=query, results_json=results_json)}
+            {"role": "user", "content": content}
         ]
         
         schema = {
@@ -67,4 +82,5 @@ class VerifierAgent(BaseAgent):
             "required": ["status", "final_answer", "missing_info"]
         }
 
-        return self.llm.structured_output(messages, schema)
+        timeout = self._llm_timeout(deadline, "verification")
+        return self.llm.structured_output(messages, schema, timeout=timeout)
@@ -0,0 +1,60 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+class DeadlineExceeded(Exception):
+    """Raised when work is attempted after its deadline has passed."""
+
+class Deadline:
+    """
+    Absolute point in time by which a unit of work must finish.
+
+    A request gets one Deadline; the pipeline carves sub-deadlines out of it
+    for the planner, each executor step and the verifier so that a slow stage
+    cannot starve the ones behind it.
+    """
+
+    def __init__(self, budget_secs: float, parent: Optional["Deadline"] = None):
+        expires_at = time.monotonic() + max(0.0, budget_secs)
+        if parent is not None:
+            expires_at = min(expires_at, parent.expires_at)
+        self.expires_at = expires_at
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def check(self, what: str = "request") -> None:
+        if self.expired():
+            raise DeadlineExceeded(f"Deadline exceeded before {what}")
+
+    def child(self, budget_secs: float) -> "Deadline":
+        """Sub-deadline of at most `budget_secs`, never outliving this one."""
+        return Deadline(budget_secs, parent=self)
+
+    def share(self, fraction: float, reserve_secs: float = 0.0) -> "Deadline":
+        """Sub-deadline for `fraction` of what is left after holding back `reserve_secs`."""
+        return self.child(max(0.0, self.remaining() - reserve_secs) * fraction)
+
+    def timeout(self, cap: Optional[float] = None) -> float:
+        """Remaining time, optionally capped, for use as an I/O timeout."""
+        remaining = self.remaining()
+        return remaining if cap is None else min(cap, remaining)
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("ai_ops_deadline", default=None)
+
+def current_deadline() -> Optional[Deadline]:
+    """Deadline of the step currently executing on this thread, if any."""
+    return _current.get()
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """Make `deadline` visible to tools and transport helpers called within the block."""
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
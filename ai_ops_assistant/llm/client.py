@@ -1,11 +1,30 @@
 import os
 import json
+import time
 from typing import Any, Dict, List, Optional, Union
-from openai import OpenAI
+from openai import (
+    APIConnectionError, APITimeoutError, BadRequestError, InternalServerError, OpenAI, RateLimitError
+)
 from dotenv import load_dotenv
 
+from ..deadline import DeadlineExceeded
+from .structured import StructuredOutputError, correction_messages, get_validator, is_strict_compatible, parse_json
+
 load_dotenv()
 
+# Retries of transient failures (429, 5xx, connection errors) for deadline-bound
+# calls, which bypass the SDK's own retries. Each also needs time left to run.
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BACKOFF_SECS = float(os.getenv("LLM_RETRY_BACKOFF_SECS", "0.5"))
+_TRANSIENT_ERRORS = (RateLimitError, InternalServerError, APIConnectionError)
+
+def _rejects_json_schema(error: BadRequestError) -> bool:
+    """Whether a 400 is about the response format itself, not e.g. context length."""
+    if getattr(error, "param", None) in ("response_format", "response_format.type", "response_format.json_schema"):
+        return True
+    message = str(error).lower()
+    return "response_format" in message or "json_schema" in message
+
 class LLMClient:
     """Wrapper for OpenAI-compatible LLM APIs."""
 
@@ -14,6 +33,8 @@ class LLMClient:
         self.api_key = os.getenv("LLM_API_KEY", "ollama")
         self.base_url = os.getenv("LLM_BASE_URL", "http://localhost:11434/v1")
         self.model = os.getenv("LLM_MODEL", "llama3")
+        # Set to False once the backend rejects a json_schema request.
+        self._json_schema_supported: Optional[bool] = None
         
         # Configure client
         if self.provider == "openai":
@@ -31,10 +52,12 @@ class LLMClient:
         tools: Optional[List[Dict[str, Any]]] = None,
         tool_choice: Optional[Union[str, Dict[str, Any]]] = None,
         response_format: Optional[Dict[str, Any]] = None,
-        temperature: float = 0.0
+        temperature: float = 0.0,
+        timeout: Optional[float] = None
     ) -> Any:
         """
         Send a chat completion request to the LLM.
+        `timeout` is the time left on the caller's deadline, if it has one.
         """
         # Prepare arguments
         kwargs = {
@@ -53,51 +76,90 @@ class LLMClient:
             kwargs["response_format"] = response_format
 
         try:
-            response = self.client.chat.completions.create(**kwargs)
+            response = self._create(kwargs, timeout)
             return response.choices[0].message
         except Exception as e:
             print(f"Error calling LLM: {e}")
             raise e
 
-    def structured_output(self, messages: List[Dict[str, str]], schema: Dict[str, Any]) -> Dict[str, Any]:
+    def _create(self, kwargs: Dict[str, Any], timeout: Optional[float]) -> Any:
         """
-        Force the LLM to output valid JSON conforming to a schema.
-        Note: Checks if the provider supports 'json_schema' or 'json_object'.
-        
-        For simplicity with generic models, we'll prompt engineering + json mode if available.
+        Issue the completion request. With a deadline-derived `timeout` the SDK's
+        own retries are disabled, since each retry would restart the clock;
+        transient failures are retried here instead, up to LLM_MAX_RETRIES times
+        and only while the deadline leaves time for another attempt.
         """
-        def _extract_first_json_object(text: str) -> str:
-            """
-            Extract the first top-level JSON object from a string.
-            Helps when models accidentally add leading/trailing text.
-            """
-            if not text:
-                return text
-            start = text.find("{")
-            if start == -1:
-                return text
-            depth = 0
-            in_str = False
-            escape = False
-            for i in range(start, len(text)):
-                ch = text[i]
-                if in_str:
-                    if escape:
-                        escape = False
-                    elif ch == "\\":
-                        escape = True
-                    elif ch == '"':
-                        in_str = False
-                else:
-                    if ch == '"':
-                        in_str = True
-                    elif ch == "{":
-                        depth += 1
-                    elif ch == "}":
-                        depth -= 1
-                        if depth == 0:
-                            return text[start : i + 1]
-            return text[start:]
+        if timeout is None:
+            return self.client.chat.completions.create(**kwargs)
+        if timeout <= 0:
+            raise DeadlineExceeded("Deadline exceeded before LLM call")
+        client = self.client.with_options(max_retries=0)
+        expires_at = time.monotonic() + timeout
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            remaining = expires_at - time.monotonic()
+            try:
+                return client.chat.completions.create(timeout=remaining, **kwargs)
+            except APITimeoutError as e:
+                raise DeadlineExceeded(f"LLM call exceeded its {timeout:.1f}s deadline") from e
+            except _TRANSIENT_ERRORS as e:
+                backoff = LLM_RETRY_BACKOFF_SECS * 2 ** attempt
+                # Not worth retrying without at least as long again for the call itself.
+                if attempt == LLM_MAX_RETRIES or expires_at - time.monotonic() <= 2 * backoff:
+                    raise
+                print(f"LLM call failed ({e}); retrying in {backoff:.1f}s.")
+                time.sleep(backoff)
+
+    def _json_schema_enabled(self) -> bool:
+        if self._json_schema_supported is not None:
+            return self._json_schema_supported
+        setting = os.getenv("LLM_JSON_SCHEMA", "auto").lower()
+        if setting == "auto":
+            return self.provider == "openai"
+        return setting in ("1", "true", "yes", "on")
+
+    def _response_format(self, schema: Dict[str, Any]) -> Dict[str, Any]:
+        if not self._json_schema_enabled():
+            return {"type": "json_object"}
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": "response", "schema": schema, "strict": is_strict_compatible(schema)},
+        }
+
+    def _create_json(self, kwargs: Dict[str, Any], schema: Dict[str, Any], timeout: Optional[float]) -> str:
+        """
+        Request a JSON completion, preferring json_schema mode. A backend that
+        rejects json_schema is remembered and served json_object from then on.
+        """
+        kwargs = {**kwargs, "response_format": self._response_format(schema)}
+        try:
+            response = self._create(kwargs, timeout)
+        except BadRequestError as e:
+            if kwargs["response_format"]["type"] != "json_schema" or not _rejects_json_schema(e):
+                raise
+            print("json_schema response format not supported; falling back to json_object.")
+            self._json_schema_supported = False
+            kwargs["response_format"] = {"type": "json_object"}
+            response = self._create(kwargs, timeout)
+        return response.choices[0].message.content or ""
+
+    def structured_output(
+        self,
+        messages: List[Dict[str, str]],
+        schema: Dict[str, Any],
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Get a JSON object from the LLM that validates against `schema`.
+
+        Uses json_schema mode when the backend supports it (LLM_JSON_SCHEMA:
+        auto/on/off), otherwise json_object mode plus the schema in the prompt.
+        Output is checked with a validator compiled once per schema. Damage such
+        as code fences or truncation is repaired locally; only if that is not
+        enough is the model sent a short correction prompt with the problems
+        found. Raises StructuredOutputError if the corrected output is still invalid.
+        """
+        started = time.monotonic()
+        validator = get_validator(schema)
 
         # Ensure we have a system message; don't mutate caller list in-place.
         msgs = list(messages)
@@ -121,17 +183,29 @@ class LLMClient:
             "model": self.model,
             "messages": msgs,
             "temperature": 0.0,
-            "response_format": {"type": "json_object"}
         }
 
         try:
-            response = self.client.chat.completions.create(**kwargs)
-            content = response.choices[0].message.content or ""
+            content = self._create_json(kwargs, schema, timeout)
             try:
-                return json.loads(content)
-            except json.JSONDecodeError:
-                extracted = _extract_first_json_object(content)
-                return json.loads(extracted)
+                value = parse_json(content)
+                errors = validator(value)
+            except StructuredOutputError as e:
+                value, errors = None, [str(e)]
+            if not errors:
+                return value
+
+            print(f"Structured output invalid ({errors[0]}); asking for a correction.")
+            output = content if value is None else json.dumps(value, ensure_ascii=False)
+            if timeout is not None:
+                timeout -= time.monotonic() - started
+            kwargs["messages"] = correction_messages(schema_hint, output, errors)
+            content = self._create_json(kwargs, schema, timeout)
+            value = parse_json(content)
+            errors = validator(value)
+            if errors:
+                raise StructuredOutputError(f"Output does not match schema: {'; '.join(errors[:5])}")
+            return value
         except Exception as e:
             print(f"Error getting structured output: {e}")
             raise e
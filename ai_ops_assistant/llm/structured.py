@@ -0,0 +1,197 @@
+import functools
+import json
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+class StructuredOutputError(ValueError):
+    """The model's output could not be parsed or repaired into schema-valid JSON."""
+
+Validator = Callable[[Any, str], List[str]]
+
+_FENCE_RE = re.compile(r"```(?:json|JSON)?\s*(.*?)(?:```|$)", re.DOTALL)
+_decoder = json.JSONDecoder()
+
+# --- Validation -------------------------------------------------------------
+
+_TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+}
+
+def _compile(schema: Dict[str, Any]) -> Validator:
+    """
+    Turn a JSON Schema into a validator function. Covers the keywords our
+    agents use: type, enum, properties, required, additionalProperties, items.
+    """
+    checks: List[Validator] = []
+
+    if "type" in schema:
+        type_names = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+        predicates = [_TYPE_CHECKS[t] for t in type_names if t in _TYPE_CHECKS]
+        expected = "/".join(type_names)
+
+        def check_type(value: Any, path: str) -> List[str]:
+            if any(p(value) for p in predicates):
+                return []
+            return [f"{path}: expected {expected}, got {type(value).__name__}"]
+        checks.append(check_type)
+
+    if "enum" in schema:
+        allowed = schema["enum"]
+
+        def check_enum(value: Any, path: str) -> List[str]:
+            return [] if value in allowed else [f"{path}: {value!r} is not one of {allowed}"]
+        checks.append(check_enum)
+
+    properties = {k: _compile(v) for k, v in schema.get("properties", {}).items()}
+    required = schema.get("required", [])
+    additional = schema.get("additionalProperties", True)
+    if properties or required or additional is not True:
+        extra = _compile(additional) if isinstance(additional, dict) else None
+
+        def check_object(value: Any, path: str) -> List[str]:
+            if not isinstance(value, dict):
+                return []
+            errors = [f"{path}: missing required key {key!r}" for key in required if key not in value]
+            for key, item in value.items():
+                if key in properties:
+                    errors.extend(properties[key](item, f"{path}.{key}"))
+                elif additional is False:
+                    errors.append(f"{path}: unexpected key {key!r}")
+                elif extra is not None:
+                    errors.extend(extra(item, f"{path}.{key}"))
+            return errors
+        checks.append(check_object)
+
+    if isinstance(schema.get("items"), dict):
+        item_validator = _compile(schema["items"])
+
+        def check_items(value: Any, path: str) -> List[str]:
+            if not isinstance(value, list):
+                return []
+            errors: List[str] = []
+            for i, item in enumerate(value):
+                errors.extend(item_validator(item, f"{path}[{i}]"))
+            return errors
+        checks.append(check_items)
+
+    def validate(value: Any, path: str = "$") -> List[str]:
+        errors: List[str] = []
+        for check in checks:
+            errors.extend(check(value, path))
+        return errors
+    return validate
+
+# The planner's schema varies with the tool subset it offers, so keep the cache bounded.
+VALIDATOR_CACHE_SIZE = 64
+
+@functools.lru_cache(maxsize=VALIDATOR_CACHE_SIZE)
+def _validator_for(schema_json: str) -> Validator:
+    return _compile(json.loads(schema_json))
+
+def get_validator(schema: Dict[str, Any]) -> Validator:
+    """Compiled validator for `schema`, reused across calls with the same schema."""
+    return _validator_for(json.dumps(schema, sort_keys=True))
+
+def is_strict_compatible(schema: Dict[str, Any]) -> bool:
+    """
+    Whether OpenAI's strict json_schema mode accepts `schema`: every object must
+    list its properties, require all of them, and forbid additional ones.
+    """
+    if schema.get("type") == "object" or "properties" in schema:
+        properties = schema.get("properties")
+        if not properties or schema.get("additionalProperties") is not False:
+            return False
+        if set(schema.get("required", [])) != set(properties):
+            return False
+        if not all(is_strict_compatible(p) for p in properties.values()):
+            return False
+    if isinstance(schema.get("items"), dict):
+        return is_strict_compatible(schema["items"])
+    return True
+
+# --- Parsing and local repair -----------------------------------------------
+
+def _close_truncated(text: str) -> Optional[Any]:
+    """
+    Parse a JSON object that was cut off (e.g. by a token limit) right after a
+    complete value, so that only closing brackets are missing.
+
+    Anything else is refused: a cut inside a string or number, after a comma or
+    inside an object could have dropped keys, steps or arguments that the schema
+    would not notice, so such output goes back to the model instead.
+    """
+    text = text.rstrip()
+    if not text or text[-1] not in '"}]':
+        return None
+    stack: List[str] = []
+    in_str = False
+    escape = False
+    for ch in text:
+        if in_str:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_str = False
+        elif ch == '"':
+            in_str = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]" and stack:
+            stack.pop()
+    if in_str or not stack:
+        return None
+    try:
+        return json.loads(text + "".join(reversed(stack)))
+    except json.JSONDecodeError:
+        return None
+
+def parse_json(text: str) -> Any:
+    """
+    Parse model output as a JSON object, repairing common damage locally:
+    code fences, prose around the object, and truncation.
+    Raises StructuredOutputError if nothing usable can be recovered.
+    """
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    fenced = _FENCE_RE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    start = text.find("{")
+    if start == -1:
+        raise StructuredOutputError("No JSON object found in model output")
+    try:
+        value, _ = _decoder.raw_decode(text, start)
+        return value
+    except json.JSONDecodeError as e:
+        repaired = _close_truncated(text[start:])
+        if repaired is None:
+            raise StructuredOutputError(f"Malformed JSON: {e}") from e
+        return repaired
+
+def correction_messages(schema_hint: str, output: str, errors: List[str]) -> List[Dict[str, str]]:
+    """
+    Short follow-up asking the model to fix its own output. Carries only the
+    schema, the problems found and the output itself, not the original conversation.
+    """
+    problems = "\n".join(f"- {e}" for e in errors[:10])
+    return [
+        {
+            "role": "system",
+            "content": (
+                "You correct JSON so that it matches a JSON Schema. "
+                "Return only the corrected JSON object, with no markdown or prose."
+            ),
+        },
+        {"role": "user", "content": f"SCHEMA:{schema_hint}\nPROBLEMS:\n{problems}\nJSON:\n{output}"},
+    ]
@@ -1,28 +1,129 @@
 import sys
 import json
 import os
+import re
 import argparse
+from typing import Optional
 from dotenv import load_dotenv
 
+from ai_ops_assistant.deadline import Deadline, DeadlineExceeded
 from ai_ops_assistant.llm.client import LLMClient
+from ai_ops_assistant.llm.structured import StructuredOutputError
+from ai_ops_assistant.memory import ResultStore, SessionMemory
 from ai_ops_assistant.tools import load_tools
-from ai_ops_assistant.agents import PlannerAgent, ExecutorAgent, VerifierAgent
+from ai_ops_assistant.agents import PlannerAgent, ExecutorAgent, VerifierAgent, ToolCallingAgent
 
 MAX_VERIFIER_RETRIES = int(os.getenv("MAX_VERIFIER_RETRIES", "2"))
 
-def run_once(user_input: str, planner: PlannerAgent, executor: ExecutorAgent, verifier: VerifierAgent) -> None:
+# "pipeline": Planner -> Executor -> Verifier. "native": one tool-calling conversation.
+AGENT_MODES = ("pipeline", "native")
+AGENT_MODE = os.getenv("AGENT_MODE", "pipeline")
+
+# End-to-end budget for one request, and how it is split between stages.
+REQUEST_DEADLINE_SECS = float(os.getenv("REQUEST_DEADLINE_SECS", "120"))
+PLANNER_BUDGET_SHARE = float(os.getenv("PLANNER_BUDGET_SHARE", "0.25"))
+VERIFIER_BUDGET_SHARE = float(os.getenv("VERIFIER_BUDGET_SHARE", "0.35"))
+
+def _execution_deadline(deadline: Deadline) -> Deadline:
+    """Executor's slice of what is left, holding back the verifier's share."""
+    return deadline.share(1.0, reserve_secs=deadline.remaining() * VERIFIER_BUDGET_SHARE)
+
+def _drop_unavailable_steps(retry_plan: dict, executor: ExecutorAgent) -> dict:
+    """
+    Remove retry steps whose tool's circuit is open, along with any step that
+    depends on a removed step's output. Retrying them would only fail again.
+    """
+    kept, dropped = [], set()
+    for step in retry_plan.get("steps", []):
+        # Only this plan's own "{{step_N...}}" references; "{{session.last.step_N}}" reads memory.
+        depends_on = {int(n) for n in re.findall(r"\{+step_(\d+)", json.dumps(step.get("tool_args", {})))}
+        if not executor.is_available(step.get("tool_name")) or depends_on & dropped:
+            dropped.add(step.get("step_id"))
+        else:
+            kept.append(step)
+    if dropped:
+        print(f"[Verifier] Suppressed retry steps {sorted(dropped, key=str)}: tool unavailable.")
+    return {**retry_plan, "steps": kept}
+
+def _verify(
+    user_input: str,
+    execution_results: list,
+    executor: ExecutorAgent,
+    verifier: VerifierAgent,
+    deadline: Deadline
+) -> dict:
+    verification = verifier.run(
+        user_input, execution_results, deadline=deadline, unavailable_tools=executor.unavailable_tools()
+    )
+    if isinstance(verification.get("retry_plan"), dict):
+        verification["retry_plan"] = _drop_unavailable_steps(verification["retry_plan"], executor)
+    return verification
+
+def run_once(
+    user_input: str,
+    planner: PlannerAgent,
+    executor: ExecutorAgent,
+    verifier: VerifierAgent,
+    session: Optional[SessionMemory] = None,
+    tool_agent: Optional[ToolCallingAgent] = None
+) -> None:
+    """Answer one request. Given a `tool_agent`, runs in native tool-calling mode instead of the pipeline."""
+    deadline = Deadline(REQUEST_DEADLINE_SECS)
+    try:
+        with ResultStore() as store:
+            if tool_agent is not None:
+                verification = _run_native(user_input, tool_agent, deadline, store, session)
+            else:
+                verification = _plan_execute_verify(user_input, planner, executor, verifier, deadline, store, session)
+    except DeadlineExceeded as e:
+        verification = {
+            "status": "failure",
+            "final_answer": "",
+            "missing_info": f"Request did not finish within {REQUEST_DEADLINE_SECS:.0f}s ({e}).",
+        }
+    except StructuredOutputError as e:
+        verification = {
+            "status": "failure",
+            "final_answer": "",
+            "missing_info": f"The model did not return a usable plan or verdict ({e}).",
+        }
+    _print_final_response(verification)
+
+def _run_native(
+    user_input: str,
+    tool_agent: ToolCallingAgent,
+    deadline: Deadline,
+    store: ResultStore,
+    session: Optional[SessionMemory]
+) -> dict:
+    print("\n[Agent] Answering with native tool calling...")
+    outcome = tool_agent.run(user_input, deadline=deadline, store=store, session=session)
+    print(f"[Agent] Finished after {outcome['llm_calls']} LLM call(s).")
+    if session is not None:
+        session.record_turn(user_input, outcome["execution_results"])
+    return outcome
+
+def _plan_execute_verify(
+    user_input: str,
+    planner: PlannerAgent,
+    executor: ExecutorAgent,
+    verifier: VerifierAgent,
+    deadline: Deadline,
+    store: ResultStore,
+    session: Optional[SessionMemory]
+) -> dict:
     # 2. Plan
     print("\n[Planner] Generating plan...")
-    plan = planner.run(user_input)
+    plan = planner.run(user_input, deadline=deadline.share(PLANNER_BUDGET_SHARE), session=session)
     print(f"[Planner] Plan: {json.dumps(plan, indent=2)}")
 
     # 3. Execute
     print("\n[Executor] Executing plan...")
-    execution_results = executor.run(plan)
+    execution_results = executor.run(plan, deadline=_execution_deadline(deadline), store=store, session=session)
 
     # 4. Verify
     print("\n[Verifier] Verifying results...")
-    verification = verifier.run(user_input, execution_results)
+    verification = _verify(user_input, execution_results, executor, verifier, deadline)
 
     # 5. Retry loop (Verifier-driven)
     retries = 0
@@ -31,6 +132,7 @@ def run_once(user_input: str, planner: PlannerAgent, executor: ExecutorAgent, ve
         and retries < MAX_VERIFIER_RETRIES
         and isinstance(verification.get("retry_plan"), dict)
         and verification["retry_plan"].get("steps")
+        and not deadline.expired()
     ):
         retries += 1
         retry_plan = verification["retry_plan"]
@@ -38,12 +140,22 @@ def run_once(user_input: str, planner: PlannerAgent, executor: ExecutorAgent, ve
         print(f"[Verifier] Retry Plan: {json.dumps(retry_plan, indent=2)}")
 
         print("\n[Executor] Executing retry plan...")
-        retry_results = executor.run(retry_plan)
+        retry_results = executor.run(retry_plan, deadline=_execution_deadline(deadline), store=store, session=session)
         execution_results.extend(retry_results)
 
         print("\n[Verifier] Re-verifying results...")
-        verification = verifier.run(user_input, execution_results)
+        try:
+            verification = _verify(user_input, execution_results, executor, verifier, deadline)
+        except (DeadlineExceeded, StructuredOutputError) as e:
+            # Keep the last verdict we have rather than discarding it.
+            print(f"[Verifier] Re-verification skipped: {e}")
+            break
+
+    if session is not None:
+        session.record_turn(user_input, execution_results)
+    return verification
 
+def _print_final_response(verification: dict) -> None:
     print("\n=== Final Response ===")
     if verification.get("status") == "success":
         answer = verification.get("final_answer")
@@ -62,6 +174,12 @@ def main():
 
     parser = argparse.ArgumentParser(description="AI Operations Assistant")
     parser.add_argument("--task", type=str, help="Run a single task non-interactively and exit.")
+    parser.add_argument(
+        "--mode",
+        choices=AGENT_MODES,
+        default=AGENT_MODE if AGENT_MODE in AGENT_MODES else "pipeline",
+        help="pipeline: Planner -> Executor -> Verifier; native: single tool-calling conversation.",
+    )
     args = parser.parse_args()
     
     # 1. Initialize
@@ -73,23 +191,40 @@ def main():
         planner = PlannerAgent(llm, tools_registry)
         executor = ExecutorAgent(llm, tools_registry)
         verifier = VerifierAgent(llm)
+        tool_agent = None
+        if args.mode == "native":
+            tool_agent = ToolCallingAgent(llm, tools_registry, executor, answer_budget_share=VERIFIER_BUDGET_SHARE)
     except Exception as e:
         print(f"Initialization Failed: {e}")
         return
 
     print("Ready! (Type 'quit' to exit)")
-    print(f"Using Provider: {llm.provider}, Model: {llm.model}")
+    print(f"Using Provider: {llm.provider}, Model: {llm.model}, Mode: {args.mode}")
 
     # Non-interactive mode: explicit --task or piped stdin
     if args.task:
-        run_once(args.task.strip(), planner, executor, verifier)
+        run_once(args.task.strip(), planner, executor, verifier, tool_agent=tool_agent)
         return
     if not sys.stdin.isatty():
         piped = sys.stdin.read().strip()
         if piped:
-            run_once(piped, planner, executor, verifier)
+            run_once(piped, planner, executor, verifier, tool_agent=tool_agent)
         return
 
+    # Interactive mode: follow-up questions can build on earlier turns.
+    session = SessionMemory()
+    try:
+        _interactive_loop(planner, executor, verifier, session, tool_agent)
+    finally:
+        session.close()
+
+def _interactive_loop(
+    planner: PlannerAgent,
+    executor: ExecutorAgent,
+    verifier: VerifierAgent,
+    session: SessionMemory,
+    tool_agent: Optional[ToolCallingAgent]
+) -> None:
     while True:
         try:
             user_input = input("\n> User Request: ").strip()
@@ -98,7 +233,7 @@ def main():
             if not user_input:
                 continue
 
-            run_once(user_input, planner, executor, verifier)
+            run_once(user_input, planner, executor, verifier, session, tool_agent)
 
         except EOFError:
             # e.g. Ctrl-D or closed stdin
@@ -0,0 +1,2 @@
+from .result_store import ResultHandle, ResultStore
+from .session import SessionMemory
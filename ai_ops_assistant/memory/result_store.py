@@ -0,0 +1,115 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from typing import Any, Optional
+
+# Outputs up to this size stay in memory; anything larger goes to disk.
+INLINE_RESULT_BYTES = int(os.getenv("INLINE_RESULT_BYTES", "16384"))
+# Total bytes of inline outputs one request may hold before everything spills.
+REQUEST_MEMORY_BUDGET_BYTES = int(os.getenv("REQUEST_MEMORY_BUDGET_BYTES", "262144"))
+# Characters of a spilled output that LLM prompts get. Defaults to the inline
+# limit, so a spilled output is never shown shorter than the largest inline one.
+LLM_RESULT_CHARS = int(os.getenv("LLM_RESULT_CHARS", str(INLINE_RESULT_BYTES)))
+# Short in-memory excerpt used for logs and summaries.
+PREVIEW_CHARS = 500
+
+class ResultHandle:
+    """
+    Reference to a tool output that was spilled to disk.
+
+    Only a short `preview` is kept in memory; `load()` reads the full value back.
+    `str()`, which is what the verifier and native tool messages see, reads the
+    first LLM_RESULT_CHARS characters of the output from disk.
+    """
+
+    def __init__(self, store: "ResultStore", path: str, size: int, preview: str):
+        self._store = store
+        self.path = path
+        self.size = size
+        self.preview = preview
+
+    def load(self) -> Any:
+        return self._store.load(self)
+
+    def llm_view(self, limit: Optional[int] = None) -> str:
+        """The output's JSON text, cut to `limit` (default LLM_RESULT_CHARS) characters."""
+        limit = LLM_RESULT_CHARS if limit is None else limit
+        with open(self.path, "r", encoding="utf-8") as f:
+            text = f.read(limit + 1)
+        if len(text) <= limit:
+            return text
+        return f"{text[:limit]}... [truncated; {self.size} bytes total]"
+
+    def __str__(self) -> str:
+        return self.llm_view()
+
+    def __repr__(self) -> str:
+        return f"ResultHandle(path={self.path!r}, size={self.size})"
+
+class ResultStore:
+    """
+    Per-request holder for tool outputs with a bounded in-memory footprint.
+
+    Small outputs are kept inline as-is. An output is spilled to a temp file,
+    and replaced by a ResultHandle, when it is larger than `inline_bytes` or
+    when keeping it inline would exceed `budget_bytes` for the request.
+    Use as a context manager (or call `close()`) to remove spilled files.
+    """
+
+    def __init__(self, inline_bytes: int = INLINE_RESULT_BYTES, budget_bytes: int = REQUEST_MEMORY_BUDGET_BYTES):
+        self.inline_bytes = inline_bytes
+        self.budget_bytes = budget_bytes
+        self.inline_used = 0
+        self._dir: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def put(self, value: Any) -> Any:
+        """Store `value`; returns either the value itself or a ResultHandle to it."""
+        encoded = json.dumps(value, default=str, ensure_ascii=False)
+        size = len(encoded.encode("utf-8"))
+        with self._lock:
+            if size <= self.inline_bytes and self.inline_used + size <= self.budget_bytes:
+                self.inline_used += size
+                return value
+            if self._dir is None:
+                self._dir = tempfile.mkdtemp(prefix="ai-ops-results-")
+            fd, path = tempfile.mkstemp(suffix=".json", dir=self._dir)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(encoded)
+        return ResultHandle(self, path, size, encoded[:PREVIEW_CHARS])
+
+    def load(self, handle: ResultHandle) -> Any:
+        with open(handle.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def discard(self, value: Any) -> None:
+        """Release what `value` (as returned by `put`) holds in this store."""
+        if isinstance(value, ResultHandle):
+            try:
+                os.remove(value.path)
+            except OSError:
+                pass
+            return
+        size = len(json.dumps(value, default=str, ensure_ascii=False).encode("utf-8"))
+        with self._lock:
+            self.inline_used = max(0, self.inline_used - size)
+
+    @staticmethod
+    def materialize(value: Any) -> Any:
+        """The full value behind `value`, loading it from disk if it is a handle."""
+        return value.load() if isinstance(value, ResultHandle) else value
+
+    def close(self) -> None:
+        with self._lock:
+            directory, self._dir = self._dir, None
+            self.inline_used = 0
+        if directory:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def __enter__(self) -> "ResultStore":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
@@ -0,0 +1,126 @@
+import json
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .result_store import ResultHandle, ResultStore
+from ..tools.base import is_error_output
+
+# Results older than this are not reused for new tool calls (placeholders still resolve).
+SESSION_TTL_SECS = float(os.getenv("SESSION_TTL_SECS", "300"))
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "5"))
+SUMMARY_PREVIEW_CHARS = 160
+
+# Tool arguments whose values are worth remembering as conversation entities.
+ENTITY_ARGS = {"repo_name": "repos", "city": "cities"}
+
+def _call_key(tool_name: str, tool_args: Dict[str, Any]) -> Tuple[str, str]:
+    return tool_name, json.dumps(tool_args, sort_keys=True, default=str)
+
+class SessionTurn:
+    """One completed request: its query and the successful tool calls it made."""
+
+    def __init__(self, number: int, query: str):
+        self.number = number
+        self.query = query
+        self.created_at = time.monotonic()
+        # step_N -> (tool_name, tool_args, stored output); N is the position in the turn
+        self.steps: Dict[int, Tuple[str, Dict[str, Any], Any]] = {}
+
+class SessionMemory:
+    """
+    What earlier turns of an interactive session produced.
+
+    The planner sees a compact summary and can point at earlier results with
+    {{session.last.step_N...}} or {{session.turn_K.step_N...}}; the executor
+    answers a step from here instead of calling the tool again when the same
+    call was made less than `ttl_secs` ago. Outputs live in a session-lifetime
+    ResultStore, so large ones stay on disk.
+    """
+
+    def __init__(self, ttl_secs: float = SESSION_TTL_SECS, max_turns: int = SESSION_MAX_TURNS):
+        self.ttl_secs = ttl_secs
+        self.max_turns = max_turns
+        self.store = ResultStore()
+        self.turns: Deque[SessionTurn] = deque()
+        self.entities: Dict[str, List[str]] = {}
+        self._turn_count = 0
+
+    def record_turn(self, query: str, execution_results: List[Dict[str, Any]]) -> None:
+        """Remember the successful steps of a finished request."""
+        self._turn_count += 1
+        turn = SessionTurn(self._turn_count, query)
+        for position, result in enumerate(execution_results, start=1):
+            tool_name = result.get("tool_name")
+            output = ResultStore.materialize(result.get("output"))
+            if tool_name in (None, "none") or is_error_output(output):
+                continue
+            tool_args = result.get("tool_args") or {}
+            turn.steps[position] = (tool_name, tool_args, self.store.put(output))
+            self._remember_entities(tool_args, output)
+
+        self.turns.append(turn)
+        while len(self.turns) > self.max_turns:
+            for _, _, stored in self.turns.popleft().steps.values():
+                self.store.discard(stored)
+
+    def _remember_entities(self, tool_args: Dict[str, Any], output: Any) -> None:
+        found = [(ENTITY_ARGS[k], v) for k, v in tool_args.items() if k in ENTITY_ARGS and isinstance(v, str)]
+        # Repository search results: remember the top few names.
+        if isinstance(output, list):
+            found += [("repos", item["name"]) for item in output[:3] if isinstance(item, dict) and "url" in item and "name" in item]
+        for kind, value in found:
+            values = self.entities.setdefault(kind, [])
+            if value in values:
+                values.remove(value)
+            values.append(value)
+            del values[:-10]
+
+    def _turn(self, ref: str) -> Optional[SessionTurn]:
+        if ref == "last":
+            return self.turns[-1] if self.turns else None
+        number = int(ref[len("turn_"):])
+        return next((t for t in self.turns if t.number == number), None)
+
+    def get_step(self, ref: str, step_id: int) -> Any:
+        """Full output of step `step_id` in turn `ref` ("last" or "turn_K"), or None."""
+        turn = self._turn(ref)
+        if turn is None or step_id not in turn.steps:
+            return None
+        return ResultStore.materialize(turn.steps[step_id][2])
+
+    def lookup(self, tool_name: str, tool_args: Dict[str, Any]) -> Optional[Any]:
+        """Output of a fresh earlier call with exactly these arguments, or None."""
+        key = _call_key(tool_name, tool_args)
+        now = time.monotonic()
+        for turn in reversed(self.turns):
+            if now - turn.created_at > self.ttl_secs:
+                break
+            for name, args, stored in turn.steps.values():
+                if _call_key(name, args) == key:
+                    return ResultStore.materialize(stored)
+        return None
+
+    def summary(self) -> str:
+        """Compact description of earlier turns for the planner prompt."""
+        lines = []
+        for turn in self.turns:
+            alias = " (session.last)" if turn is self.turns[-1] else ""
+            lines.append(f"turn_{turn.number}{alias}: {turn.query!r}")
+            for step_id, (tool_name, tool_args, stored) in turn.steps.items():
+                if isinstance(stored, ResultHandle):
+                    preview = stored.preview
+                elif isinstance(stored, (dict, list)):
+                    preview = json.dumps(stored, default=str)
+                else:
+                    preview = str(stored)
+                args = json.dumps(tool_args, separators=(",", ":"), default=str)
+                lines.append(f"  step_{step_id}: {tool_name}({args}) -> {preview[:SUMMARY_PREVIEW_CHARS]}")
+        for kind, values in self.entities.items():
+            lines.append(f"known {kind}: {', '.join(values)}")
+        return "\n".join(lines)
+
+    def close(self) -> None:
+        self.turns.clear()
+        self.store.close()
@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 from typing import Any, Dict, List, Type
 from pydantic import BaseModel
+from .index import ToolIndex
 
 class BaseTool(ABC):
     """Abstract base class for all tools."""
@@ -25,14 +26,35 @@ class BaseTool(ABC):
             }
         }
 
+    def search_text(self) -> str:
+        """Text the tool is found by: its name, description and argument docs."""
+        parts = [self.name, self.description]
+        for field_name, field in self.args_schema.model_fields.items():
+            parts.append(field_name)
+            if field.description:
+                parts.append(field.description)
+        return " ".join(parts)
+
+def is_error_output(result: Any) -> bool:
+    """Tools report failures as an error string, an {"error": ...} dict, or a list of those."""
+    if isinstance(result, str):
+        return result.startswith("Error")
+    if isinstance(result, dict):
+        return "error" in result
+    if isinstance(result, list) and result:
+        return all(isinstance(item, dict) and "error" in item for item in result)
+    return False
+
 class ToolRegistry:
     """Registry to manage available tools."""
     
     def __init__(self):
         self._tools: Dict[str, BaseTool] = {}
+        self._index = ToolIndex()
 
     def register(self, tool: BaseTool):
         self._tools[tool.name] = tool
+        self._index.add(tool.name, tool.search_text())
 
     def get_tool(self, name: str) -> BaseTool:
         return self._tools.get(name)
@@ -42,3 +64,7 @@ class ToolRegistry:
 
     def get_tools_schema(self) -> List[Dict[str, Any]]:
         return [tool.to_json_schema() for tool in self._tools.values()]
+
+    def search(self, query: str, k: int) -> List[BaseTool]:
+        """The `k` registered tools most relevant to `query`."""
+        return [self._tools[name] for name in self._index.search(query, k) if name in self._tools]
@@ -0,0 +1,160 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+CIRCUIT_FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "5"))
+CIRCUIT_WINDOW = int(os.getenv("CIRCUIT_WINDOW", "20"))
+CIRCUIT_OPEN_SECS = float(os.getenv("CIRCUIT_OPEN_SECS", "30"))
+NEGATIVE_CACHE_TTL_SECS = float(os.getenv("NEGATIVE_CACHE_TTL_SECS", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """
+    Failure-rate circuit breaker.
+
+    Closed: calls flow and outcomes are kept in a rolling window. Once the window
+    holds at least `min_calls` outcomes and the failure rate reaches
+    `failure_rate`, the circuit opens and calls are rejected for `open_secs`.
+    After that it goes half-open and lets a single probe through: success closes
+    the circuit, failure re-opens it. A probe whose outcome is never reported
+    (e.g. it was abandoned at a deadline) is replaced after another `open_secs`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = CIRCUIT_FAILURE_RATE,
+        min_calls: int = CIRCUIT_MIN_CALLS,
+        window: int = CIRCUIT_WINDOW,
+        open_secs: float = CIRCUIT_OPEN_SECS,
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_secs = open_secs
+        self.state = CLOSED
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probe_started_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now. Claims the probe slot when half-open."""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                if now - self._opened_at < self.open_secs:
+                    return False
+                self.state = HALF_OPEN
+                self._probe_started_at = None
+            if self.state == HALF_OPEN:
+                if self._probe_started_at is not None and now - self._probe_started_at < self.open_secs:
+                    return False
+                self._probe_started_at = now
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.state = CLOSED
+                self._outcomes.clear()
+            self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._outcomes.append(False)
+            if self.state == HALF_OPEN:
+                self._open()
+                return
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+                self._open()
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._probe_started_at = None
+
+    def is_open(self) -> bool:
+        """True while calls would be rejected outright (open and not yet due a probe)."""
+        return self.retry_after() > 0
+
+    def retry_after(self) -> float:
+        """Seconds until the circuit will next let a call through."""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self.open_secs - (time.monotonic() - self._opened_at))
+
+class BreakerRegistry:
+    """Lazily created circuit breakers, one per name (tool or host)."""
+
+    def __init__(self, **breaker_kwargs: Any):
+        self._breaker_kwargs = breaker_kwargs
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(name, **self._breaker_kwargs)
+            return breaker
+
+    def open_names(self) -> List[str]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return sorted(b.name for b in breakers if b.is_open())
+
+class NegativeCache:
+    """Short-lived memory of (tool, arguments) pairs that just failed, and how."""
+
+    def __init__(self, ttl_secs: float = NEGATIVE_CACHE_TTL_SECS):
+        self.ttl_secs = ttl_secs
+        self._entries: Dict[Tuple[str, str], Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(tool_name: str, tool_args: Dict[str, Any]) -> Tuple[str, str]:
+        return tool_name, json.dumps(tool_args, sort_keys=True, default=str)
+
+    def get(self, key: Tuple[str, str]) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, result = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            return result
+
+    def put(self, key: Tuple[str, str], result: Any) -> None:
+        if self.ttl_secs <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]
+            for k in expired:
+                del self._entries[k]
+            self._entries[key] = (now + self.ttl_secs, result)
+
+def unavailable_result(tool_name: str, reason: str, retry_after_secs: float = 0.0) -> Dict[str, Any]:
+    """Structured step output for a tool that was not (or could not be) called."""
+    return {
+        "error": reason,
+        "status": "unavailable",
+        "tool_name": tool_name,
+        "retry_after_secs": round(retry_after_secs, 1),
+    }
+
+# Shared across requests: an outage seen by one request should protect the next.
+tool_breakers = BreakerRegistry()
+host_breakers = BreakerRegistry()
@@ -1,7 +1,8 @@
-import requests
 from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 from .base import BaseTool
+from . import transport
+from ..deadline import DeadlineExceeded
 
 class GitHubSearchArgs(BaseModel):
     query: str = Field(..., description="The search query (e.g., 'python agents')")
@@ -17,7 +18,7 @@ class GitHubSearchTool(BaseTool):
         params = {"q": query, "per_page": limit, "sort": "stars"}
         
         try:
-            response = requests.get(url, params=params)
+            response = transport.get(url, params=params, key=self.name)
             response.raise_for_status()
             data = response.json()
             
@@ -30,6 +31,8 @@ class GitHubSearchTool(BaseTool):
                     "url": item["html_url"]
                 })
             return results
+        except (transport.UpstreamUnavailable, DeadlineExceeded):
+            raise
         except Exception as e:
             return [{"error": str(e)}]
 
@@ -51,8 +54,10 @@ class GitHubContentTool(BaseTool):
             url += f"/contents/{path}"
             
         try:
-            response = requests.get(url)
+            response = transport.get(url, key=self.name)
             response.raise_for_status()
             return response.json()
+        except (transport.UpstreamUnavailable, DeadlineExceeded):
+            raise
         except Exception as e:
             return {"error": str(e)}
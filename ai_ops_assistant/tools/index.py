@@ -0,0 +1,75 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, List
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from get how i in is it its me my of on or the this to what with".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; underscores split identifiers, plurals ("-s", "-ies") are folded."""
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 4 and token.endswith("ies"):
+            token = token[:-3] + "y"
+        elif len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+class ToolIndex:
+    """
+    BM25 index over tool descriptions.
+
+    Documents are added once, when a tool is registered; document frequencies
+    are kept up to date incrementally so a search never rescans the catalog text.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._docs: Dict[str, Counter] = {}
+        self._lengths: Dict[str, int] = {}
+        self._df: Counter = Counter()
+        self._total_length = 0
+
+    def add(self, name: str, text: str) -> None:
+        if name in self._docs:
+            self.remove(name)
+        terms = Counter(tokenize(text))
+        self._docs[name] = terms
+        self._lengths[name] = sum(terms.values())
+        self._total_length += self._lengths[name]
+        self._df.update(terms.keys())
+
+    def remove(self, name: str) -> None:
+        terms = self._docs.pop(name)
+        self._total_length -= self._lengths.pop(name)
+        self._df.subtract(terms.keys())
+
+    def search(self, query: str, k: int) -> List[str]:
+        """Names of the `k` best-matching tools; ties keep registration order."""
+        if not self._docs:
+            return []
+        n_docs = len(self._docs)
+        avg_length = self._total_length / n_docs or 1.0
+        query_terms = set(tokenize(query))
+        idf = {
+            t: math.log(1 + (n_docs - self._df[t] + 0.5) / (self._df[t] + 0.5))
+            for t in query_terms if self._df[t] > 0
+        }
+
+        scores = {}
+        for name, terms in self._docs.items():
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[name] / avg_length)
+            scores[name] = sum(
+                weight * terms[t] * (self.k1 + 1) / (terms[t] + norm)
+                for t, weight in idf.items() if terms[t]
+            )
+        order = {name: i for i, name in enumerate(self._docs)}
+        ranked = sorted(self._docs, key=lambda name: (-scores[name], order[name]))
+        return ranked[:k]
@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Deque, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from ..deadline import DeadlineExceeded, current_deadline
+from .circuit import host_breakers
+
+DEFAULT_TIMEOUT_SECS = 15
+
+# Hedging kicks in only once we have enough samples for a stable p95.
+HEDGE_MIN_SAMPLES = 20
+HEDGE_WINDOW = 200
+HEDGE_QUANTILE = 0.95
+
+class LatencyTracker:
+    """Rolling window of successful request latencies, keyed by endpoint."""
+
+    def __init__(self, window: int = HEDGE_WINDOW, min_samples: int = HEDGE_MIN_SAMPLES):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, secs: float) -> None:
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(secs)
+
+    def quantile(self, key: str, q: float = HEDGE_QUANTILE) -> Optional[float]:
+        """Latency at quantile `q`, or None while there are too few samples."""
+        with self._lock:
+            samples = self._samples.get(key)
+            if not samples or len(samples) < self.min_samples:
+                return None
+            ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class UpstreamUnavailable(requests.RequestException):
+    """
+    The upstream host is down, rate-limiting us, or its circuit is open.
+    Tools should let this propagate so the executor can fail fast on it.
+    """
+
+def _is_unavailable(response: requests.Response) -> bool:
+    if response.status_code >= 500 or response.status_code == 429:
+        return True
+    # GitHub signals an exhausted rate limit with a 403.
+    return response.status_code == 403 and response.headers.get("X-RateLimit-Remaining") == "0"
+
+latency = LatencyTracker()
+_hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="ai-ops-hedge")
+
+def request_timeout(default: float = DEFAULT_TIMEOUT_SECS) -> float:
+    """
+    Timeout for the next HTTP call: the default, shortened to whatever is left
+    of the current step's deadline. Raises DeadlineExceeded if nothing is left.
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return default
+    deadline.check("HTTP request")
+    return deadline.timeout(cap=default)
+
+def _timed_get(key: str, url: str, params: Optional[Dict[str, Any]], headers: Optional[Dict[str, str]], timeout: float) -> requests.Response:
+    """One attempt. Outcomes are recorded on the host breaker by `get`, once per logical request."""
+    started = time.monotonic()
+    response = requests.get(url, params=params, headers=headers, timeout=timeout)
+    if _is_unavailable(response):
+        raise UpstreamUnavailable(f"{urlsplit(url).netloc} returned HTTP {response.status_code}", response=response)
+    latency.record(key, time.monotonic() - started)
+    return response
+
+def _hedged_get(
+    key: str,
+    url: str,
+    params: Optional[Dict[str, Any]],
+    headers: Optional[Dict[str, str]],
+    budget: float,
+    hedge: bool
+) -> requests.Response:
+    delay = latency.quantile(key) if hedge else None
+    if delay is None or delay >= budget:
+        return _timed_get(key, url, params, headers, budget)
+
+    started = time.monotonic()
+    primary = _hedge_pool.submit(_timed_get, key, url, params, headers, budget)
+    done, _ = wait([primary], timeout=delay)
+    if done:
+        return primary.result()
+
+    backup_budget = max(0.0, budget - (time.monotonic() - started))
+    pending = {primary, _hedge_pool.submit(_timed_get, key, url, params, headers, backup_budget)}
+    error: Optional[BaseException] = None
+    while pending:
+        remaining = budget - (time.monotonic() - started)
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                return future.result()
+            except requests.RequestException as e:
+                error = e
+    if error is not None:
+        raise error
+    raise requests.Timeout(f"GET {url} timed out after {budget:.1f}s (hedged)")
+
+def get(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    key: Optional[str] = None,
+    hedge: bool = True,
+    timeout: float = DEFAULT_TIMEOUT_SECS,
+) -> requests.Response:
+    """
+    Deadline-aware GET. Only use for idempotent requests.
+
+    When `hedge` is set and the endpoint has a latency history, a backup request
+    is fired once the first one has been outstanding for longer than the p95
+    latency, and whichever answers first wins. The loser is left to run out its
+    own timeout; its response is discarded.
+
+    Raises UpstreamUnavailable without making a call while the host's circuit
+    is open, and when the host fails or answers with a 5xx/429/rate-limit 403.
+    A timeout that only fired because the step's deadline shortened it raises
+    DeadlineExceeded instead and is not held against the host.
+    """
+    host = urlsplit(url).netloc
+    key = key or host
+    budget = request_timeout(timeout)
+    breaker = host_breakers.get(host)
+    if not breaker.allow():
+        raise UpstreamUnavailable(f"Circuit open for {host}; retry in {breaker.retry_after():.0f}s")
+
+    # One outcome per logical request, however many hedged attempts it took.
+    try:
+        response = _hedged_get(key, url, params, headers, budget, hedge)
+    except requests.Timeout as e:
+        if budget < timeout:
+            raise DeadlineExceeded(f"GET {host} cut off by the step deadline after {budget:.1f}s") from e
+        breaker.record_failure()
+        raise UpstreamUnavailable(f"{host} timed out: {e}") from e
+    except UpstreamUnavailable:
+        breaker.record_failure()
+        raise
+    except requests.ConnectionError as e:
+        breaker.record_failure()
+        raise UpstreamUnavailable(f"{host} unreachable: {e}") from e
+    breaker.record_success()
+    return response
@@ -2,8 +2,7 @@ import requests
 from typing import Any, Dict, Optional
 from pydantic import BaseModel, Field
 from .base import BaseTool
-
-DEFAULT_TIMEOUT_SECS = 15
+from . import transport
 
 class WeatherToolArgs(BaseModel):
     city: str = Field(..., description="Name of the city to get weather for")
@@ -19,7 +18,7 @@ class WeatherTool(BaseTool):
         params = {"name": city, "count": 1, "language": "en", "format": "json"}
         
         try:
-            response = requests.get(url, params=params, timeout=DEFAULT_TIMEOUT_SECS)
+            response = transport.get(url, params=params, key=f"{self.name}.geocode")
             data = response.json()
             if not data.get("results"):
                 return None
@@ -28,6 +27,8 @@ class WeatherTool(BaseTool):
                 "longitude": data["results"][0]["longitude"],
                 "name": data["results"][0]["name"]
             }
+        except transport.UpstreamUnavailable:
+            raise
         except requests.RequestException:
             return None
 
@@ -44,7 +45,7 @@ class WeatherTool(BaseTool):
         }
         
         try:
-            response = requests.get(url, params=params, timeout=DEFAULT_TIMEOUT_SECS)
+            response = transport.get(url, params=params, key=f"{self.name}.forecast")
             data = response.json()
             current = data.get("current", {})
             
@@ -54,5 +55,7 @@ class WeatherTool(BaseTool):
                 "wind_speed": current.get("wind_speed_10m"),
                 "unit": data.get("current_units", {}).get("temperature_2m", "°C")
             }
+        except transport.UpstreamUnavailable:
+            raise
         except requests.RequestException as e:
             return {"error": str(e), "source": "get_weather"}
@@ -1,8 +1,18 @@
+import json
+import time
+
+import openai
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
+from ai_ops_assistant.deadline import Deadline, DeadlineExceeded, deadline_scope
+from ai_ops_assistant.llm import client as llm_client, structured
 from ai_ops_assistant.llm.client import LLMClient
+from ai_ops_assistant.memory import ResultHandle, ResultStore, SessionMemory
+from ai_ops_assistant.tools import transport
+from ai_ops_assistant.tools.base import BaseTool
+from ai_ops_assistant.tools.circuit import BreakerRegistry, NegativeCache
 from ai_ops_assistant.tools import load_tools
-from ai_ops_assistant.agents import PlannerAgent, ExecutorAgent, VerifierAgent
+from ai_ops_assistant.agents import PlannerAgent, ExecutorAgent, VerifierAgent, ToolCallingAgent
 
 class TestAIOpsAssistant(unittest.TestCase):
     def setUp(self):
@@ -64,5 +74,388 @@ class TestAIOpsAssistant(unittest.TestCase):
         self.assertEqual(verification["status"], "success")
         self.assertIn("missing_info", verification)
 
+    def test_executor_enforces_deadline(self):
+        slow_tool = MagicMock()
+        slow_tool.name = "get_weather"
+        slow_tool.run.side_effect = lambda **kwargs: time.sleep(0.5) or {"temperature": 15}
+        self.registry._tools["get_weather"] = slow_tool
+
+        plan = {
+            "steps": [
+                {"step_id": 1, "description": "Slow call", "tool_name": "get_weather", "tool_args": {"city": "London"}},
+                {"step_id": 2, "description": "Also slow", "tool_name": "get_weather", "tool_args": {"city": "Paris"}},
+            ]
+        }
+        executor = ExecutorAgent(self.mock_llm, self.registry)
+        started = time.monotonic()
+        results = executor.run(plan, deadline=Deadline(0.1))
+
+        self.assertLess(time.monotonic() - started, 0.4)
+        # Each step only gets its share of the budget, so neither can run long.
+        for result in results:
+            self.assertIn("deadline", result["output"].lower())
+
+    def test_hedged_get_uses_backup_response(self):
+        tracker = transport.LatencyTracker(min_samples=1)
+        tracker.record("slow", 0.01)
+        primary, backup = MagicMock(status_code=200), MagicMock(status_code=200)
+        responses = iter([primary, backup])
+
+        def fake_get(url, **kwargs):
+            response = next(responses)
+            if response is primary:
+                time.sleep(0.5)
+            return response
+
+        with patch.object(transport, "latency", tracker), patch.object(transport.requests, "get", side_effect=fake_get):
+            self.assertIs(transport.get("https://example.test", key="slow"), backup)
+
+    def test_open_circuit_fails_fast(self):
+        down_tool = MagicMock()
+        down_tool.name = "get_weather"
+        down_tool.run.side_effect = transport.UpstreamUnavailable("api.open-meteo.com returned HTTP 503")
+        self.registry._tools["get_weather"] = down_tool
+
+        plan = {
+            "steps": [
+                {"step_id": i, "description": city, "tool_name": "get_weather", "tool_args": {"city": city}}
+                for i, city in enumerate(["London", "Paris", "Berlin", "Berlin"], start=1)
+            ]
+        }
+        executor = ExecutorAgent(
+            self.mock_llm, self.registry,
+            breakers=BreakerRegistry(min_calls=2, open_secs=60),
+            negative_cache=NegativeCache(ttl_secs=60),
+        )
+        results = executor.run(plan)
+
+        # Two failures open the circuit; later steps never reach the tool.
+        self.assertEqual(down_tool.run.call_count, 2)
+        self.assertTrue(all(r["output"]["status"] == "unavailable" for r in results))
+        self.assertEqual(executor.unavailable_tools(), ["get_weather"])
+
+    def test_bad_arguments_leave_circuit_closed(self):
+        plan = {
+            "steps": [
+                {"step_id": i, "description": city, "tool_name": "get_weather", "tool_args": {"location": city}}
+                for i, city in enumerate(["London", "Paris", "Berlin", "Rome", "Oslo", "Lima"], start=1)
+            ]
+        }
+        executor = ExecutorAgent(self.mock_llm, self.registry, breakers=BreakerRegistry(min_calls=2))
+        results = executor.run(plan)
+
+        # Wrong keyword arguments are the plan's fault, not the tool's.
+        self.assertTrue(all("unexpected keyword argument" in r["output"] for r in results))
+        self.assertEqual(executor.unavailable_tools(), [])
+
+    def test_deadline_timeouts_do_not_trip_host_breaker(self):
+        breakers = BreakerRegistry(min_calls=2)
+        slow = transport.requests.Timeout("read timed out")
+        with patch.object(transport, "host_breakers", breakers), patch.object(transport.requests, "get", side_effect=slow):
+            for _ in range(6):
+                with deadline_scope(Deadline(0.05)), self.assertRaises(DeadlineExceeded):
+                    transport.get("https://slow.example/repos")
+        self.assertFalse(breakers.get("slow.example").is_open())
+
+    def test_hedged_get_counts_one_failure_per_request(self):
+        breakers = BreakerRegistry(min_calls=2)
+        tracker = transport.LatencyTracker(min_samples=1)
+        tracker.record("flaky", 0.01)
+
+        def refuse(url, **kwargs):
+            time.sleep(0.05)
+            raise transport.requests.ConnectionError("connection refused")
+
+        with patch.object(transport, "host_breakers", breakers), patch.object(transport, "latency", tracker), \
+                patch.object(transport.requests, "get", side_effect=refuse) as fake_get:
+            with self.assertRaises(transport.UpstreamUnavailable):
+                transport.get("https://flaky.example/repos", key="flaky")
+        self.assertEqual(fake_get.call_count, 2)
+        # Two failed attempts, one failed request: below min_calls, so still closed.
+        self.assertFalse(breakers.get("flaky.example").is_open())
+
+    def test_retry_keeps_steps_that_read_session_memory(self):
+        from ai_ops_assistant.main import _drop_unavailable_steps
+        executor = MagicMock()
+        executor.is_available.side_effect = lambda name: name != "github_search"
+        retry_plan = {"steps": [
+            {"step_id": 1, "tool_name": "github_search", "tool_args": {"query": "agents"}},
+            {"step_id": 2, "tool_name": "github_content",
+             "tool_args": {"repo_name": "{{session.last.step_1[0].name}}"}},
+            {"step_id": 3, "tool_name": "github_content", "tool_args": {"repo_name": "{{step_1[0].name}}"}},
+        ]}
+        kept = _drop_unavailable_steps(retry_plan, executor)["steps"]
+        self.assertEqual([s["step_id"] for s in kept], [2])
+
+    def test_large_outputs_spill_and_resolve_lazily(self):
+        search_tool = MagicMock()
+        search_tool.run.return_value = [{"name": "octo/big", "description": "x" * 5000}]
+        content_tool = MagicMock()
+        content_tool.run.return_value = {"content": "README"}
+        self.registry._tools["github_search"] = search_tool
+        self.registry._tools["github_content"] = content_tool
+
+        plan = {
+            "steps": [
+                {"step_id": 1, "description": "Search", "tool_name": "github_search", "tool_args": {"query": "big"}},
+                {"step_id": 2, "description": "Readme", "tool_name": "github_content",
+                 "tool_args": {"repo_name": "{{step_1[0].name}}", "path": "README.md"}},
+            ]
+        }
+        executor = ExecutorAgent(self.mock_llm, self.registry)
+        with ResultStore(inline_bytes=1024) as store:
+            results = executor.run(plan, store=store)
+            self.assertIsInstance(results[0]["output"], ResultHandle)
+            self.assertEqual(results[0]["output"].load()[0]["name"], "octo/big")
+            # Prompts get the configured amount of the output, not the short log preview.
+            prompt_view = json.dumps(results, default=str)
+            self.assertIn("x" * 4000, prompt_view)
+            self.assertIn("x" * 100, results[0]["output"].llm_view(limit=200))
+            self.assertIn("truncated", results[0]["output"].llm_view(limit=200))
+            self.assertEqual(results[1]["output"], {"content": "README"})
+            content_tool.run.assert_called_once_with(repo_name="octo/big", path="README.md")
+
+    def test_session_reuses_results_across_turns(self):
+        search_tool = MagicMock()
+        search_tool.run.return_value = [{"name": "octo/agents", "description": "", "stars": 1, "url": "https://github.com/octo/agents"}]
+        content_tool = MagicMock()
+        content_tool.run.return_value = {"content": "README"}
+        self.registry._tools["github_search"] = search_tool
+        self.registry._tools["github_content"] = content_tool
+        executor = ExecutorAgent(self.mock_llm, self.registry)
+        session = SessionMemory()
+        self.addCleanup(session.close)
+
+        search_step = {"step_id": 1, "description": "Search", "tool_name": "github_search", "tool_args": {"query": "agents"}}
+        session.record_turn("Find an agents repo", executor.run({"steps": [search_step]}, session=session))
+
+        follow_up = {
+            "steps": [
+                search_step,
+                {"step_id": 2, "description": "Readme", "tool_name": "github_content",
+                 "tool_args": {"repo_name": "{{session.last.step_1[0].name}}", "path": "README.md"}},
+            ]
+        }
+        results = executor.run(follow_up, session=session)
+
+        search_tool.run.assert_called_once()
+        self.assertEqual(results[0]["output"][0]["name"], "octo/agents")
+        content_tool.run.assert_called_once_with(repo_name="octo/agents", path="README.md")
+        self.assertIn("octo/agents", session.summary())
+
+        self.mock_llm.structured_output.return_value = {"steps": []}
+        PlannerAgent(self.mock_llm, load_tools()).run("and its README?", session=session)
+        prompt = self.mock_llm.structured_output.call_args[0][0][0]["content"]
+        self.assertIn("session.last", prompt)
+
+    def test_planner_offers_only_relevant_tools(self):
+        for topic in ["jira tickets", "slack messages", "stock prices", "calendar events", "email inbox"]:
+            tool = MagicMock(spec=BaseTool)
+            tool.name = topic.replace(" ", "_")
+            tool.search_text.return_value = f"{tool.name} Look up {topic}."
+            tool.to_json_schema.return_value = {"type": "function", "function": {"name": tool.name}}
+            self.registry.register(tool)
+
+        self.mock_llm.structured_output.return_value = {"steps": []}
+        PlannerAgent(self.mock_llm, self.registry, top_k=2).run("What is the weather in Berlin?")
+
+        messages, plan_schema = self.mock_llm.structured_output.call_args[0]
+        enum = plan_schema["properties"]["steps"]["items"]["properties"]["tool_name"]["enum"]
+        self.assertEqual(len(enum), 3)
+        self.assertIn("get_weather", enum)
+        self.assertNotIn("jira_tickets", messages[0]["content"])
+
+    def test_tool_search_matches_real_descriptions(self):
+        registry = load_tools()
+        self.assertEqual(registry.search("find a repository about agents", 1)[0].name, "github_search")
+        self.assertEqual(registry.search("weather in Berlin", 1)[0].name, "get_weather")
+
+    def test_native_tool_calling_runs_calls_in_parallel(self):
+        weather_tool = MagicMock()
+        weather_tool.run.side_effect = lambda city: {"city": city, "temperature": 15}
+        self.registry._tools["get_weather"] = weather_tool
+        registry_schema = load_tools().get_tools_schema()
+        self.registry.get_tools_schema = MagicMock(return_value=registry_schema)
+
+        def tool_call(call_id, city):
+            call = MagicMock(id=call_id)
+            call.function.name = "get_weather"
+            call.function.arguments = '{"city": "%s"}' % city
+            return call
+
+        self.mock_llm.chat_completion.side_effect = [
+            MagicMock(content=None, tool_calls=[tool_call("c1", "London"), tool_call("c2", "Paris")]),
+            MagicMock(content="London and Paris are both 15°C.", tool_calls=None),
+        ]
+        executor = ExecutorAgent(self.mock_llm, self.registry)
+        outcome = ToolCallingAgent(self.mock_llm, self.registry, executor).run("Weather in London and Paris?")
+
+        self.assertEqual(outcome["status"], "success")
+        self.assertEqual(outcome["llm_calls"], 2)
+        self.assertEqual(weather_tool.run.call_count, 2)
+        final_messages = self.mock_llm.chat_completion.call_args[0][0]
+        self.assertEqual([m["tool_call_id"] for m in final_messages if m["role"] == "tool"], ["c1", "c2"])
+        self.assertEqual(self.mock_llm.chat_completion.call_args_list[0].kwargs["tools"], registry_schema)
+
+    def test_native_mode_rejects_non_object_arguments(self):
+        call = MagicMock(id="call_1")
+        call.function.name = "get_weather"
+        call.function.arguments = "null"
+        self.mock_llm.chat_completion.side_effect = [
+            MagicMock(content=None, tool_calls=[call]),
+            MagicMock(content="I need a city name.", tool_calls=None),
+        ]
+        executor = ExecutorAgent(self.mock_llm, self.registry)
+        outcome = ToolCallingAgent(self.mock_llm, self.registry, executor).run("Weather?")
+
+        self.assertEqual(outcome["status"], "success")
+        self.assertEqual(outcome["execution_results"][0]["output"], "Error: tool arguments must be a JSON object")
+
+    def test_native_mode_sees_earlier_turns(self):
+        session = SessionMemory()
+        self.addCleanup(session.close)
+        session.record_turn("Find an agents repo", [{
+            "step_id": 1, "description": "Search", "tool_name": "github_search", "tool_args": {"query": "agents"},
+            "output": [{"name": "octo/agents", "description": "", "stars": 1, "url": "https://github.com/octo/agents"}],
+        }])
+        self.registry.get_tools_schema = MagicMock(return_value=[])
+        self.mock_llm.chat_completion.return_value = MagicMock(content="It is octo/agents.", tool_calls=None)
+
+        executor = ExecutorAgent(self.mock_llm, self.registry)
+        ToolCallingAgent(self.mock_llm, self.registry, executor).run("and what about its README?", session=session)
+
+        messages = self.mock_llm.chat_completion.call_args[0][0]
+        self.assertIn("octo/agents", messages[1]["content"])
+        self.assertEqual(messages[-1], {"role": "user", "content": "and what about its README?"})
+
+    def test_native_mode_keeps_time_for_the_answer(self):
+        hung_tool = MagicMock()
+        hung_tool.name = "get_weather"
+        hung_tool.run.side_effect = lambda **kwargs: time.sleep(1.0)
+        self.registry._tools["get_weather"] = hung_tool
+        self.registry.get_tools_schema = MagicMock(return_value=[])
+
+        call = MagicMock(id="c1")
+        call.function.name = "get_weather"
+        call.function.arguments = '{"city": "London"}'
+        self.mock_llm.chat_completion.side_effect = [
+            MagicMock(content=None, tool_calls=[call]),
+            MagicMock(content="Weather is unavailable right now.", tool_calls=None),
+        ]
+        executor = ExecutorAgent(self.mock_llm, self.registry)
+        outcome = ToolCallingAgent(self.mock_llm, self.registry, executor).run("Weather?", deadline=Deadline(0.3))
+
+        self.assertEqual(outcome["status"], "success")
+        self.assertIn("deadline", outcome["execution_results"][0]["output"])
+        self.assertGreater(self.mock_llm.chat_completion.call_args.kwargs["timeout"], 0.05)
+
+    def _llm_returning(self, *contents):
+        llm = LLMClient()
+        llm.client = MagicMock()
+        llm.client.chat.completions.create.side_effect = [
+            MagicMock(choices=[MagicMock(message=MagicMock(content=c))]) for c in contents
+        ]
+        return llm
+
+    def test_structured_output_repairs_truncated_json_locally(self):
+        schema = {"type": "object", "properties": {"steps": {"type": "array"}}, "required": ["steps"]}
+        llm = self._llm_returning('```json\n{"steps": [{"step_id": 1, "description": "Get weather"}]')
+
+        plan = llm.structured_output([{"role": "user", "content": "Plan"}], schema)
+
+        self.assertEqual(plan, {"steps": [{"step_id": 1, "description": "Get weather"}]})
+        self.assertEqual(llm.client.chat.completions.create.call_count, 1)
+
+    def test_structured_output_never_accepts_a_cut_off_value(self):
+        schema = {
+            "type": "object",
+            "properties": {"status": {"type": "string"}, "final_answer": {"type": "string"}},
+            "required": ["status", "final_answer"],
+        }
+        llm = self._llm_returning(
+            '{"status": "success", "final_answer": "London is 15',
+            '{"status": "success", "final_answer": "London is 15°C."}',
+        )
+
+        verdict = llm.structured_output([{"role": "user", "content": "Verify"}], schema)
+
+        # The partial answer is dropped locally, so the model is asked for a correction.
+        self.assertEqual(verdict["final_answer"], "London is 15°C.")
+        self.assertEqual(llm.client.chat.completions.create.call_count, 2)
+
+    def test_structured_output_rejects_a_cut_inside_tool_args(self):
+        schema = {"type": "object", "properties": {"steps": {"type": "array"}}, "required": ["steps"]}
+        plan_json = '{"steps": [{"step_id": 1, "tool_name": "github_content", "tool_args": {"repo_name": "octo/agents", "path": "README.md"}}]}'
+        llm = self._llm_returning(plan_json[:plan_json.index("README") + 4], plan_json)
+
+        plan = llm.structured_output([{"role": "user", "content": "Plan"}], schema)
+
+        # Closing the cut would silently drop "path"; the model is asked again instead.
+        self.assertEqual(plan["steps"][0]["tool_args"]["path"], "README.md")
+        self.assertEqual(llm.client.chat.completions.create.call_count, 2)
+        for cut in ('{"steps": [{"step_id": 1}, ', '{"steps": [{"tool_args": {"city": "Berlin", "x": "y'):
+            with self.assertRaises(structured.StructuredOutputError):
+                structured.parse_json(cut)
+
+    def test_structured_output_sends_targeted_correction(self):
+        schema = {
+            "type": "object",
+            "properties": {"status": {"type": "string", "enum": ["success", "failure"]}},
+            "required": ["status"],
+        }
+        llm = self._llm_returning('{"status": "done"}', '{"status": "success"}')
+
+        verdict = llm.structured_output([{"role": "user", "content": "A long verifier prompt"}], schema)
+
+        self.assertEqual(verdict, {"status": "success"})
+        correction = llm.client.chat.completions.create.call_args.kwargs["messages"]
+        self.assertIn("$.status", correction[-1]["content"])
+        self.assertNotIn("A long verifier prompt", json.dumps(correction))
+
+    def test_json_schema_fallback_only_for_response_format_errors(self):
+        def bad_request(param, message):
+            return openai.BadRequestError(message, response=MagicMock(status_code=400), body={"param": param, "message": message})
+
+        schema = {"type": "object"}
+        with patch.dict("os.environ", {"LLM_JSON_SCHEMA": "on"}):
+            llm = LLMClient()
+            llm.client = MagicMock()
+            llm.client.chat.completions.create.side_effect = bad_request("messages", "context length exceeded")
+            with self.assertRaises(openai.BadRequestError):
+                llm.structured_output([{"role": "user", "content": "Plan"}], schema)
+            self.assertIsNone(llm._json_schema_supported)
+
+            llm.client.chat.completions.create.side_effect = [
+                bad_request("response_format", "json_schema is not supported"),
+                MagicMock(choices=[MagicMock(message=MagicMock(content='{"ok": true}'))]),
+            ]
+            self.assertEqual(llm.structured_output([{"role": "user", "content": "Plan"}], schema), {"ok": True})
+            self.assertFalse(llm._json_schema_supported)
+
+    def test_llm_retries_transient_errors_within_deadline(self):
+        llm = LLMClient()
+        llm.client = MagicMock()
+        llm.client.with_options.return_value = llm.client
+        overloaded = openai.InternalServerError("overloaded", response=MagicMock(status_code=503), body=None)
+        ok = MagicMock(choices=[MagicMock(message=MagicMock(content="hi"))])
+        messages = [{"role": "user", "content": "Hi"}]
+
+        llm.client.chat.completions.create.side_effect = [overloaded, ok]
+        with patch.object(llm_client, "LLM_RETRY_BACKOFF_SECS", 0.01):
+            self.assertEqual(llm.chat_completion(messages, timeout=10).content, "hi")
+        self.assertEqual(llm.client.chat.completions.create.call_count, 2)
+
+        # With no time left for a backoff and another attempt, the error surfaces.
+        llm.client.chat.completions.create.reset_mock()
+        llm.client.chat.completions.create.side_effect = [overloaded, ok]
+        with self.assertRaises(openai.InternalServerError):
+            llm.chat_completion(messages, timeout=0.5)
+        self.assertEqual(llm.client.chat.completions.create.call_count, 1)
+
+    def test_validator_cache_is_bounded(self):
+        for i in range(structured.VALIDATOR_CACHE_SIZE + 10):
+            structured.get_validator({"type": "string", "enum": [f"tool_{i}", "none"]})
+        self.assertLessEqual(structured._validator_for.cache_info().currsize, structured.VALIDATOR_CACHE_SIZE)
+
 if __name__ == "__main__":
     unittest.main()